@@ -0,0 +1,128 @@
+"""
+bench_commit_paths.py
+
+Measures only the commit step (no inference) in a throwaway repo with heavy client hooks:
+
+- porcelain   : current path, `git commit -m` via run_git_commit
+- hook-native : the user's own `git commit`, with prepare-commit-msg writing the message
+                file through write_commit_msg_file (an inline stand-in for the shipped
+                hook, which would also run inference)
+- plumbing    : write-tree/commit-tree/update-ref via run_plumbing_commit
+
+Porcelain and hook-native run the same hooks once each, so they are expected
+to cost the same here. Hook-native is about working inside `git commit` (and
+pre-commit failing before any inference is spent), not about commit latency.
+Only the plumbing path skips the hooks.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_commit_paths.py --runs 5 --hook-delay 0.5
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from gitcommitai.commit_write import run_git_commit, run_plumbing_commit
+
+MESSAGE = "feat: add benchmark change"
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+@contextlib.contextmanager
+def silence_stdout():
+    """Silences both Python and child process output (git prints to fd 1)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def write_hook(repo: Path, name: str, body: str):
+    hook = repo / ".git" / "hooks" / name
+    hook.write_text(f"#!/bin/sh\n{body}\n")
+    hook.chmod(0o755)
+
+
+def setup_repo(repo: Path, hook_delay: float):
+    subprocess.check_call(["git", "init", "-q", str(repo)])
+    subprocess.check_call(["git", "-C", str(repo), "config", "user.name", "bench"])
+    subprocess.check_call(["git", "-C", str(repo), "config", "user.email", "bench@example.com"])
+    # Simulate heavy linters/formatters/test hooks
+    write_hook(repo, "pre-commit", f"sleep {hook_delay}")
+    write_hook(repo, "commit-msg", f"sleep {hook_delay / 2}")
+    write_hook(
+        repo, "prepare-commit-msg",
+        f'PYTHONPATH="{SRC_DIR}" "{sys.executable}" -c '
+        f'"import sys; from gitcommitai.commit_write import write_commit_msg_file; '
+        f"write_commit_msg_file('{MESSAGE}', sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)\" "
+        f'"$@"'
+    )
+
+
+def stage_change(repo: Path, i: int):
+    (repo / f"file_{i}.txt").write_text(f"change {i}\n")
+    subprocess.check_call(["git", "add", "-A"], cwd=repo)
+
+
+def hook_native_commit():
+    subprocess.run(["git", "commit", "--no-edit", "-q"], check=True)
+
+
+PATHS = {
+    "porcelain": lambda: run_git_commit(MESSAGE),
+    "hook-native": hook_native_commit,
+    "plumbing": lambda: run_plumbing_commit(MESSAGE),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark commit write paths")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--hook-delay", type=float, default=0.5, help="Seconds the pre-commit hook sleeps")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp)
+        setup_repo(repo, args.hook_delay)
+        cwd = os.getcwd()
+        os.chdir(repo)
+        try:
+            results = {}
+            i = 0
+            for name, commit in PATHS.items():
+                timings = []
+                for _ in range(args.runs):
+                    stage_change(repo, i)
+                    i += 1
+                    start = time.perf_counter()
+                    with silence_stdout():
+                        commit()
+                    timings.append(time.perf_counter() - start)
+                results[name] = timings
+            count = int(subprocess.check_output(["git", "rev-list", "--count", "HEAD"], text=True))
+        finally:
+            os.chdir(cwd)
+
+    print(f"📊 Commit paths, {args.runs} run(s), pre-commit hook {args.hook_delay:.2f}s:")
+    baseline = statistics.median(results["porcelain"])
+    for name, timings in results.items():
+        median = statistics.median(timings)
+        print(f"  {name:<12}: median {median * 1000:8.1f} ms ({baseline / median:5.1f}x vs porcelain)")
+    print(f"  commits created: {count}")
+
+
+if __name__ == "__main__":
+    main()
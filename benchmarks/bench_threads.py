@@ -0,0 +1,140 @@
+"""
+bench_threads.py
+
+Compares prompt-eval and decode tokens/sec for the old fixed `n_threads=4`
+against the topology-aware config from cpu_topology (with and without
+pinning). Every config runs with each profile's own n_ctx/n_batch (the
+settings the app actually uses), since thread scaling of prompt eval depends
+on batch size. Each run appends one JSON line per profile and config to the
+results file, so runs from different build boxes (8, 16, 64 cores...) end up
+in one corpus.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_threads.py --model src/models/Phi-3-mini-4k-instruct-Q4_K_M.gguf
+    PYTHONPATH=src python benchmarks/bench_threads.py --summary
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from gitcommitai.cpu_topology import detect_topology, choose_thread_config
+from gitcommitai.profile_manager import load_profiles
+
+RESULTS_PATH = Path(__file__).resolve().parent / "thread_results.jsonl"
+SAMPLE_DIFF = "diff --git a/app.py b/app.py\n" + "+    value = compute(value)  # refactor loop\n" * 40
+
+
+def measure(model_path: str, n_ctx: int, n_batch: int, n_threads: int, n_threads_batch: int,
+            pin_cpus, decode_tokens: int) -> dict:
+    """Runs in a child process so affinity and the model don't leak between configs."""
+    code = (
+        "import json, os, sys, time\n"
+        "from llama_cpp import Llama\n"
+        "args = json.loads(sys.argv[1])\n"
+        "if args['pin_cpus']: os.sched_setaffinity(0, args['pin_cpus'])\n"
+        "llm = Llama(model_path=args['model'], n_ctx=args['n_ctx'], n_batch=args['n_batch'],\n"
+        "            n_threads=args['n_threads'], n_threads_batch=args['n_threads_batch'], verbose=False)\n"
+        "# Leave room for the decoded tokens inside the profile's context window\n"
+        "tokens = llm.tokenize(args['prompt'].encode())[:args['n_ctx'] - args['decode_tokens'] - 1]\n"
+        "start = time.perf_counter(); llm.eval(tokens); prompt_s = time.perf_counter() - start\n"
+        "start = time.perf_counter()\n"
+        "for _ in range(args['decode_tokens']):\n"
+        "    llm.eval([llm.sample(temp=0.0)])\n"
+        "decode_s = time.perf_counter() - start\n"
+        "print(json.dumps({'prompt_tps': len(tokens) / prompt_s, 'decode_tps': args['decode_tokens'] / decode_s}))\n"
+    )
+    payload = json.dumps({
+        "model": model_path, "n_ctx": n_ctx, "n_batch": n_batch,
+        "n_threads": n_threads, "n_threads_batch": n_threads_batch,
+        "pin_cpus": pin_cpus, "prompt": SAMPLE_DIFF, "decode_tokens": decode_tokens,
+    })
+    out = subprocess.check_output([sys.executable, "-c", code, payload], text=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(args):
+    topology = detect_topology()
+    print(f"🖥️  {platform.node()}: {topology.describe()}")
+
+    configs = {
+        "fixed-4": {"n_threads": 4, "n_threads_batch": 4, "pin_cpus": None},
+        "topology": choose_thread_config(topology),
+        "topology-pinned": choose_thread_config(topology, pin_threads=True),
+    }
+    if not hasattr(os, "sched_setaffinity"):
+        configs.pop("topology-pinned")
+
+    profiles = load_profiles()
+    # "auto" entries in profiles.json only hold overrides, not full settings
+    names = args.profiles or [n for n, p in profiles.items() if "n_ctx" in p and "n_batch" in p]
+
+    with open(args.output, "a") as f:
+        for profile_name in names:
+            profile = profiles[profile_name]
+            for name, config in configs.items():
+                result = measure(args.model, profile["n_ctx"], profile["n_batch"], config["n_threads"],
+                                 config["n_threads_batch"], config["pin_cpus"], args.decode_tokens)
+                record = {
+                    "host": platform.node(),
+                    "logical_cpus": len(topology.logical_cpus),
+                    "physical_cores": len(topology.core_groups),
+                    "cpu_quota": topology.cpu_quota,
+                    "model": Path(args.model).name,
+                    "profile": profile_name,
+                    "n_ctx": profile["n_ctx"],
+                    "n_batch": profile["n_batch"],
+                    "config": name,
+                    "n_threads": config["n_threads"],
+                    "n_threads_batch": config["n_threads_batch"],
+                    "timestamp": time.time(),
+                    **result,
+                }
+                f.write(json.dumps(record) + "\n")
+                print(f"  {profile_name:<8} n_batch={profile['n_batch']:<4} {name:<16} "
+                      f"t={config['n_threads']:<3} tb={config['n_threads_batch']:<3} "
+                      f"prompt {result['prompt_tps']:8.1f} tok/s  decode {result['decode_tps']:6.1f} tok/s")
+
+
+def summary(args):
+    """Prints topology-vs-fixed speedups per host and profile from the results corpus."""
+    latest = {}
+    with open(args.output) as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["host"], record["model"], record.get("profile", "-"), record["n_batch"])
+            latest[key + (record["config"],)] = record
+
+    for (host, model, profile, n_batch, config), record in sorted(latest.items()):
+        base = latest.get((host, model, profile, n_batch, "fixed-4"))
+        if config == "fixed-4" or not base:
+            continue
+        print(f"{host} ({record['logical_cpus']} cpus) {model} {profile} n_batch={n_batch} {config}: "
+              f"prompt {record['prompt_tps'] / base['prompt_tps']:.2f}x, "
+              f"decode {record['decode_tps'] / base['decode_tps']:.2f}x vs fixed-4")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thread scheduling for prompt eval and decode")
+    parser.add_argument("--model", help="Path to GGUF model file")
+    parser.add_argument("--decode-tokens", type=int, default=64)
+    parser.add_argument("--profiles", nargs="+", help="Profiles to run (default: all, incl. profiles.json)")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--summary", action="store_true", help="Summarize the results corpus and exit")
+    args = parser.parse_args()
+
+    if args.summary:
+        summary(args)
+    elif args.model:
+        run(args)
+    else:
+        parser.error("--model is required unless --summary is given")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,18 +21,30 @@ CACHE_PATH = GIT_ROOT / ".gitcommitai" / "cache.json"
 CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
-def load_cache():
-    if CACHE_PATH.exists():
-        with open(CACHE_PATH, "r") as f:
+def load_cache(cache_path=CACHE_PATH):
+    if Path(cache_path).exists():
+        with open(cache_path, "r") as f:
             return json.load(f)
     return {}
 
 
-def save_cache(data):
-    with open(CACHE_PATH, "w") as f:
+def save_cache(cache_path, data):
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w") as f:
         json.dump(data, f, indent=2)
 
 
+def is_cache_valid(cache_path, diff_type, profile_name=None):
+    """
+    True if a profile config with a chosen quant was cached for this diff size
+    category (and, when given, for the same --profile name).
+    """
+    cache = load_cache(cache_path)
+    if profile_name is not None and cache.get("profile_name") != profile_name:
+        return False
+    return "quant" in cache.get("profile_config", {}) and cache.get("diff_type") == diff_type
+
+
 def hash_diff_text(diff_text):
     return hashlib.md5(diff_text.encode("utf-8")).hexdigest()
 
@@ -55,7 +67,7 @@ def is_profile_changed(current_diff_hash, current_system_signature):
 
 
 def update_cache(diff_hash, system_signature):
-    save_cache({
+    save_cache(CACHE_PATH, {
         "last_diff_hash": diff_hash,
         "last_system_signature": system_signature
     })
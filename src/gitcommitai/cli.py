@@ -5,13 +5,16 @@ import tempfile
 from pathlib import Path
 
 from gitcommitai.diff_profiler import classify_diff_size
-from gitcommitai.profile_manager import get_profile_config, PROFILE_HINTS
+from gitcommitai.profile_manager import get_profile_config, load_profiles, get_thread_overrides
 from gitcommitai.cache_manager import load_cache, save_cache, is_cache_valid
-from gitcommitai.llm_infer import run_llm, load_prompt
+from gitcommitai.llm_infer import run_llm, load_prompt, load_model, suppress_stdout
 from gitcommitai.model_downloader import interactive_model_selector, PHI3_MODELS
 from gitcommitai.diff_extractor import get_git_diff
+from gitcommitai.quant_cascade import run_cascade, record_run, print_stats, get_installed_quants, DEFAULT_THRESHOLD
+from gitcommitai.refine_session import RefineSession, interactive_refine
+from gitcommitai.cpu_topology import resolve_thread_config, apply_affinity
 
-from gitcommitai.commit_write import handle_commit_flow
+from gitcommitai.commit_write import handle_commit_flow, write_commit_msg_file, USER_MESSAGE_SOURCES
 
 VERSION = "1.0.0"
 
@@ -19,6 +22,7 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 PROMPT_TEMPLATE_PATH = ROOT_DIR / "templates" / "prompt_template.txt"
 MODEL_DIR = ROOT_DIR / "models"
 CACHE_PATH = ROOT_DIR / ".gitcommitai" / "cache.json"
+DEFAULT_QUANT = "Q4_K_M"
 
 
 def log(msg, verbose=False, quiet=False, always=False):
@@ -26,13 +30,34 @@ def log(msg, verbose=False, quiet=False, always=False):
         print(msg)
 
 
+def get_hook_quant():
+    """Picks a quant without prompting: git gives hooks no stdin."""
+    cached_quant = load_cache(CACHE_PATH).get("profile_config", {}).get("quant")
+    if cached_quant:
+        return cached_quant
+    installed = get_installed_quants(MODEL_DIR)
+    if DEFAULT_QUANT in installed or not installed:
+        return DEFAULT_QUANT
+    return installed[0]
+
+
 def cli():
     parser = argparse.ArgumentParser(description="GitCommitAI+: Local-first Git commit assistant powered by LLMs")
     parser.add_argument("--confirm", action="store_true", help="Confirm and write the commit")
     parser.add_argument("--edit", action="store_true", help="Edit the message before committing")
+    parser.add_argument("--interactive", action="store_true", help="Regenerate/refine the message in a loop before committing")
     parser.add_argument("--dry-run", action="store_true", help="Preview only, don't write commit")
+    parser.add_argument("--plumbing", action="store_true", help="Commit via write-tree/commit-tree/update-ref (skips hooks)")
+    parser.add_argument("--hook-file", help="Commit message file passed by prepare-commit-msg; write the message there instead of committing")
+    parser.add_argument("--hook-source", help="Commit message source passed by prepare-commit-msg")
     parser.add_argument("--profile", default="auto", help="System profile to use")
     parser.add_argument("--model", help="Path to model (overrides profile)")
+    parser.add_argument("--threads", type=int, help="CPU threads for generation (overrides topology detection)")
+    parser.add_argument("--threads-batch", type=int, help="CPU threads for prompt eval (overrides topology detection)")
+    parser.add_argument("--pin-threads", action=argparse.BooleanOptionalAction, default=None, help="Pin inference to physical performance cores")
+    parser.add_argument("--cascade", action="store_true", help="Start with the smallest installed quant and escalate on low confidence")
+    parser.add_argument("--cascade-sample-baseline", action="store_true", help="Also time the largest installed quant to compare against the cascade")
+    parser.add_argument("--cascade-threshold", type=float, default=DEFAULT_THRESHOLD, help="Minimum score (0-1) to accept a cascade output")
     parser.add_argument("--reset-model-selection", action="store_true", help="Reset model selection and choose again")
     parser.add_argument("--version", action="store_true", help="Show version and exit")
     parser.add_argument("--quiet", action="store_true", help="Suppress non-essential output")
@@ -40,17 +65,37 @@ def cli():
 
     args = parser.parse_args()
 
+    if args.interactive and args.cascade:
+        parser.error("--interactive and --cascade cannot be combined")
+    if args.cascade and args.model:
+        parser.error("--model and --cascade cannot be combined")
+    if args.cascade_sample_baseline and not args.cascade:
+        parser.error("--cascade-sample-baseline requires --cascade")
+
     if args.version:
         print(f"GitCommitAI+ version {VERSION}")
         sys.exit(0)
 
+    if args.hook_file and args.hook_source in USER_MESSAGE_SOURCES:
+        # The user already gave a message (-m, merge, amend...), don't spend time on inference
+        sys.exit(0)
+
+    if args.hook_file:
+        # Output from inside `git commit` would clutter the user's terminal
+        args.quiet = True
+
     # Step 1: Get Git diff
     diff = get_git_diff()
     diff_profile = classify_diff_size()
     diff_type = diff_profile.category
 
     # Step 2: Load or compute profile
-    cache_valid = is_cache_valid(CACHE_PATH, diff_type)
+    profiles = load_profiles()
+    if args.profile != "auto" and args.profile not in profiles:
+        print(f"❌ Unknown profile: {args.profile}")
+        sys.exit(1)
+
+    cache_valid = is_cache_valid(CACHE_PATH, diff_type, args.profile)
     profile_config = None
 
     if cache_valid and not args.reset_model_selection:
@@ -61,20 +106,22 @@ def cli():
         if args.profile == "auto":
             profile_config = get_profile_config()
             log(f"⚙️  Auto-selected profile: {profile_config}", verbose=args.verbose, quiet=args.quiet)
-        elif args.profile in PROFILE_HINTS:
-            profile_config = PROFILE_HINTS[args.profile]
-            log(f"⚙️  Using profile: {args.profile}", verbose=args.verbose, quiet=args.quiet)
         else:
-            print(f"❌ Unknown profile: {args.profile}")
-            sys.exit(1)
+            profile_config = profiles[args.profile]
+            log(f"⚙️  Using profile: {args.profile}", verbose=args.verbose, quiet=args.quiet)
 
-        selected_quant = interactive_model_selector(PHI3_MODELS)
-        profile_config["quant"] = selected_quant
+        if args.hook_file:
+            # Don't cache, so the next interactive run still offers the model setup
+            profile_config["quant"] = get_hook_quant()
+        else:
+            selected_quant = interactive_model_selector(PHI3_MODELS)
+            profile_config["quant"] = selected_quant
 
-        save_cache(CACHE_PATH, {
-            "profile_config": profile_config,
-            "diff_type": diff_type
-        })
+            save_cache(CACHE_PATH, {
+                "profile_config": profile_config,
+                "profile_name": args.profile,
+                "diff_type": diff_type
+            })
 
     # Step 3: Load prompt template
     if not PROMPT_TEMPLATE_PATH.exists():
@@ -89,25 +136,71 @@ def cli():
         quant = profile_config["quant"]
         model_path = MODEL_DIR / f"Phi-3-mini-4k-instruct-{quant}.gguf"
 
-    # Step 5: Run LLM
-    result = run_llm(
-        model_path=str(model_path),
-        prompt_text=prompt_text,
-        n_ctx=profile_config["n_ctx"],
-        n_threads=4,
-        n_batch=profile_config["n_batch"],
-        n_gpu_layers=profile_config["n_gpu_layers"]
-    )
+    # Step 5: Pick threads from CPU topology (profile keys and flags override)
+    thread_config = resolve_thread_config(get_thread_overrides(args.profile), args.threads, args.threads_batch, args.pin_threads)
+    if apply_affinity(thread_config["pin_cpus"]):
+        log(f"📌 Pinned to CPUs {thread_config['pin_cpus']}", verbose=args.verbose, quiet=args.quiet)
+    n_threads = thread_config["n_threads"]
+    n_threads_batch = thread_config["n_threads_batch"]
+
+    # Step 6: Run LLM
+    if args.interactive:
+        with suppress_stdout(args.quiet):
+            llm = load_model(
+                str(model_path),
+                n_ctx=profile_config["n_ctx"],
+                n_threads=n_threads,
+                n_batch=profile_config["n_batch"],
+                n_gpu_layers=profile_config["n_gpu_layers"],
+                n_threads_batch=n_threads_batch
+            )
+        result = interactive_refine(RefineSession(llm, prompt_text))
+        if result is None:
+            print("🚫 Commit cancelled.")
+            sys.exit(0)
+    elif args.cascade:
+        # Each quant's load_model/report_throughput output is hidden too
+        with suppress_stdout(args.quiet):
+            cascade_result = run_cascade(
+                prompt_text=prompt_text,
+                model_dir=MODEL_DIR,
+                n_ctx=profile_config["n_ctx"],
+                n_threads=n_threads,
+                n_batch=profile_config["n_batch"],
+                n_gpu_layers=profile_config["n_gpu_layers"],
+                threshold=args.cascade_threshold,
+                n_threads_batch=n_threads_batch,
+                sample_baseline=args.cascade_sample_baseline,
+                quiet=args.quiet
+            )
+        result = cascade_result.message
+        log(f"🪜 Cascade picked {cascade_result.quant} (score {cascade_result.score:.2f})", verbose=args.verbose, quiet=args.quiet)
+        print_stats(record_run(cascade_result), quiet=args.quiet)
+    else:
+        with suppress_stdout(args.quiet):
+            result = run_llm(
+                model_path=str(model_path),
+                prompt_text=prompt_text,
+                n_ctx=profile_config["n_ctx"],
+                n_threads=n_threads,
+                n_batch=profile_config["n_batch"],
+                n_gpu_layers=profile_config["n_gpu_layers"],
+                n_threads_batch=n_threads_batch
+            )
+
+    if args.hook_file:
+        write_commit_msg_file(result, args.hook_file, args.hook_source)
+        log("✔ Commit message written for git.", verbose=args.verbose, quiet=args.quiet)
+        return
 
-    
     handle_commit_flow(
         message=result,
-        confirm=args.confirm,
-        edit=args.edit,
-        dry_run=args.dry_run
+        confirm=args.confirm or args.interactive,
+        edit=args.edit and not args.interactive,
+        dry_run=args.dry_run,
+        plumbing=args.plumbing
     )
 
 
-
 if __name__ == "__main__":
     cli()
@@ -2,6 +2,17 @@
 import subprocess
 import tempfile
 import os
+from pathlib import Path
+
+# prepare-commit-msg sources where the user already supplied a message (-m/-F, merge, squash, amend)
+USER_MESSAGE_SOURCES = ("message", "merge", "squash", "commit")
+
+# In-progress operations `git commit` knows how to finish but the plumbing path doesn't
+IN_PROGRESS_STATES = ("MERGE_HEAD", "CHERRY_PICK_HEAD", "REVERT_HEAD", "REBASE_HEAD", "rebase-merge", "rebase-apply")
+
+# Characters git may pick with core.commentChar=auto
+AUTO_COMMENT_CHARS = "#;@!$%^&|:"
+SCISSORS = "------------------------ >8 ------------------------"
 
 def preview_message(message: str):
     print("\n📝 Commit message preview:")
@@ -23,12 +34,104 @@ def run_git_commit(message: str):
     subprocess.run(["git", "commit", "-m", message])
     print("✅ Commit completed.")
 
-def handle_commit_flow(message: str, confirm=False, edit=False, dry_run=False):
+def get_comment_char(existing: str = "") -> str:
+    """Returns git's comment character (core.commentChar), defaulting to '#'."""
+    result = subprocess.run(["git", "config", "core.commentChar"], capture_output=True, text=True)
+    comment_char = result.stdout.strip() if result.returncode == 0 else ""
+    if comment_char == "auto":
+        # git picked a character not used by the message; the template's comment lines reveal it
+        for line in existing.splitlines():
+            if line[:1] and line[0] in AUTO_COMMENT_CHARS:
+                return line[0]
+        return "#"
+    return comment_char or "#"
+
+def write_commit_msg_file(message: str, msg_file: str, source: str = None) -> bool:
+    """
+    Hook-native mode: writes the message into the file git passes to
+    prepare-commit-msg, keeping git's own comment lines below it and
+    everything from the `git commit -v` scissors line onward unchanged. The
+    commit then completes inside the user's `git commit` rather than a second one.
+    Returns False when the user already supplied a message.
+    """
+    if source in USER_MESSAGE_SOURCES:
+        return False
+
+    path = Path(msg_file)
+    existing = path.read_text() if path.exists() else ""
+    comment_char = get_comment_char(existing)
+
+    lines = existing.splitlines(keepends=True)
+    head, tail = lines, []
+    for i, line in enumerate(lines):
+        if line.rstrip("\n") == f"{comment_char} {SCISSORS}":
+            head, tail = lines[:i], lines[i:]
+            break
+    comments = "".join(line for line in head if line.startswith(comment_char))
+    if comments and not comments.endswith("\n"):
+        comments += "\n"
+
+    content = message.strip() + "\n"
+    if comments or tail:
+        content += "\n" + comments + "".join(tail)
+    path.write_text(content)
+    return True
+
+def _git_state_file(name: str) -> Path:
+    return Path(subprocess.check_output(["git", "rev-parse", "--git-path", name], text=True).strip())
+
+def run_plumbing_commit(message: str):
+    """
+    Non-interactive fast path: commits the index with `write-tree`,
+    `commit-tree` and `update-ref`. This skips client hooks and commit signing.
+    Returns the new commit id, or None when it refuses to commit.
+    """
+    message = message.strip()
+    if not message:
+        print("❌ Aborting commit due to empty commit message.")
+        return None
+
+    try:
+        for state in IN_PROGRESS_STATES:
+            if _git_state_file(state).exists():
+                print(f"❌ {state} exists, finish this operation with `git commit` instead of --plumbing.")
+                return None
+
+        tree = subprocess.check_output(["git", "write-tree"], text=True).strip()
+
+        head = subprocess.run(["git", "rev-parse", "--verify", "-q", "HEAD"], capture_output=True, text=True)
+        parent = head.stdout.strip() if head.returncode == 0 else None
+
+        if parent:
+            base_tree = subprocess.check_output(["git", "rev-parse", f"{parent}^{{tree}}"], text=True).strip()
+        else:
+            base_tree = subprocess.check_output(["git", "hash-object", "-t", "tree", os.devnull], text=True).strip()
+        if base_tree == tree:
+            print("❌ Nothing staged to commit.")
+            return None
+
+        commit_cmd = ["git", "commit-tree", tree]
+        if parent:
+            commit_cmd += ["-p", parent]
+        commit = subprocess.check_output(commit_cmd, input=message + "\n", text=True).strip()
+
+        subject = message.splitlines()[0]
+        # Passing the old value makes update-ref fail if HEAD moved underneath us ("" = must not exist yet)
+        subprocess.check_call(["git", "update-ref", "-m", f"commit: {subject}", "HEAD", commit, parent or ""])
+    except subprocess.CalledProcessError as e:
+        # git already printed the reason (unmerged index, missing identity, HEAD moved...)
+        print(f"❌ Plumbing commit failed at `{' '.join(e.cmd[:2])}`.")
+        return None
+
+    print(f"✅ Commit completed ({commit[:7]}).")
+    return commit
+
+def handle_commit_flow(message: str, confirm=False, edit=False, dry_run=False, plumbing=False):
     """
     Central function to handle:
     - preview
     - optional editing
-    - optional commit
+    - optional commit (porcelain `git commit` or the plumbing fast path)
     """
     preview_message(message)
 
@@ -41,5 +144,7 @@ def handle_commit_flow(message: str, confirm=False, edit=False, dry_run=False):
         final_message = edit_message_interactively(message)
 
     if confirm or edit:
-        run_git_commit(final_message)
-
+        if plumbing:
+            run_plumbing_commit(final_message)
+        else:
+            run_git_commit(final_message)
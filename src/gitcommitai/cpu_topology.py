@@ -0,0 +1,260 @@
+"""
+cpu_topology.py
+
+Detects usable CPUs (affinity mask, cgroup CPU quota, SMT siblings and hybrid
+P/E cores) and picks separate thread counts for prompt eval (`n_threads_batch`,
+compute bound) and token generation (`n_threads`, memory bound).
+"""
+
+import math
+import os
+import platform
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import psutil
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+PROC_CGROUP = Path("/proc/self/cgroup")
+SYS_DEVICES = Path("/sys/devices")
+
+
+@dataclass
+class CpuTopology:
+    logical_cpus: list      # CPUs this process may run on
+    core_groups: list       # SMT sibling groups, one per physical core
+    performance_cpus: Optional[set]  # P-core CPUs on hybrid systems, None otherwise
+    cpu_quota: Optional[float]       # cgroup CPU limit in cores, None if unlimited
+
+    @property
+    def performance_cores(self) -> list:
+        if not self.performance_cpus:
+            return self.core_groups
+        return [g for g in self.core_groups if g[0] in self.performance_cpus]
+
+    def describe(self) -> str:
+        quota = f"{self.cpu_quota:g}" if self.cpu_quota else "none"
+        return (f"{len(self.logical_cpus)} logical / {len(self.core_groups)} physical / "
+                f"{len(self.performance_cores)} performance cores, cgroup quota {quota}")
+
+
+def parse_cpu_list(text: str) -> list:
+    """Parses kernel CPU lists like '0-3,8,10-11'."""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def get_available_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def get_own_cgroups(proc_cgroup: Path = PROC_CGROUP) -> dict:
+    """
+    Maps hierarchies from /proc/self/cgroup to this process's cgroup path:
+    "" for the cgroup v2 unified hierarchy, "cpu" for the v1 cpu controller.
+    """
+    paths = {}
+    for line in (_read(proc_cgroup) or "").splitlines():
+        _, controllers, path = line.split(":", 2)
+        if controllers == "":
+            paths[""] = path
+        elif "cpu" in controllers.split(","):
+            paths["cpu"] = path
+    return paths
+
+
+def _walk_up(mount: Path, path: str) -> list:
+    """Returns the cgroup directory for `path` and every ancestor up to the mount root."""
+    parts = [p for p in path.strip("/").split("/") if p]
+    return [mount.joinpath(*parts[:i]) for i in range(len(parts), -1, -1)]
+
+
+def _v1_cpu_mount(cgroup_root: Path) -> Optional[Path]:
+    for name in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+        if (cgroup_root / name).is_dir():
+            return cgroup_root / name
+    return None
+
+
+def get_cgroup_cpu_limit(cgroup_root: Path = CGROUP_ROOT, proc_cgroup: Path = PROC_CGROUP) -> Optional[float]:
+    """
+    Returns the container CPU limit in cores, or None if unlimited. Walks from
+    the process's own cgroup (per /proc/self/cgroup) up to the root, so limits
+    on parent cgroups, systemd CPUQuota= slices and host cgroup namespaces are
+    seen too. The smallest quota found wins.
+    """
+    own = get_own_cgroups(proc_cgroup)
+    limits = []
+
+    for directory in _walk_up(cgroup_root, own.get("", "/")):
+        cpu_max = _read(directory / "cpu.max")
+        if cpu_max:
+            quota, _, period = cpu_max.partition(" ")
+            if quota != "max" and period:
+                limits.append(int(quota) / int(period))
+
+    v1_mount = _v1_cpu_mount(cgroup_root)
+    if v1_mount:
+        for directory in _walk_up(v1_mount, own.get("cpu", "/")):
+            quota = _read(directory / "cpu.cfs_quota_us")
+            period = _read(directory / "cpu.cfs_period_us")
+            if quota and period and int(quota) > 0:
+                limits.append(int(quota) / int(period))
+
+    return min(limits) if limits else None
+
+
+def get_core_groups(cpus: list, sys_devices: Path = SYS_DEVICES) -> list:
+    """Groups available CPUs by physical core using sysfs SMT sibling lists."""
+    groups = {}
+    for cpu in cpus:
+        topology = sys_devices / "system" / "cpu" / f"cpu{cpu}" / "topology"
+        siblings = _read(topology / "core_cpus_list") or _read(topology / "thread_siblings_list")
+        if siblings is None:
+            break
+        key = tuple(parse_cpu_list(siblings))
+        groups.setdefault(key, []).append(cpu)
+    else:
+        return sorted(groups.values())
+
+    # No sysfs (macOS, Windows): assume SMT siblings are evenly spread
+    physical = psutil.cpu_count(logical=False) or len(cpus)
+    per_core = max(1, round(len(cpus) / physical))
+    return [cpus[i:i + per_core] for i in range(0, len(cpus), per_core)]
+
+
+def get_performance_cpus(sys_devices: Path = SYS_DEVICES) -> Optional[set]:
+    """
+    Returns the performance-core CPUs on hybrid systems: Intel exposes them as
+    the `cpu_core` PMU, ARM big.LITTLE as the highest `cpu_capacity`.
+    """
+    p_cores = _read(sys_devices / "cpu_core" / "cpus")
+    if p_cores and (sys_devices / "cpu_atom").exists():
+        return set(parse_cpu_list(p_cores))
+
+    capacities = {}
+    for path in (sys_devices / "system" / "cpu").glob("cpu[0-9]*/cpu_capacity"):
+        value = _read(path)
+        if value:
+            capacities[int(path.parent.name[3:])] = int(value)
+    if capacities and len(set(capacities.values())) > 1:
+        top = max(capacities.values())
+        return {cpu for cpu, cap in capacities.items() if cap == top}
+    return None
+
+
+def _get_mac_performance_core_count() -> Optional[int]:
+    try:
+        out = subprocess.check_output(["sysctl", "-n", "hw.perflevel0.physicalcpu"],
+                                      text=True, stderr=subprocess.DEVNULL)
+        return int(out.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def detect_topology(cgroup_root: Path = CGROUP_ROOT, sys_devices: Path = SYS_DEVICES) -> CpuTopology:
+    cpus = get_available_cpus()
+    groups = get_core_groups(cpus, sys_devices)
+    performance = get_performance_cpus(sys_devices)
+
+    if performance is None and platform.system() == "Darwin":
+        # Apple Silicon lists P-cores after E-cores
+        p_count = _get_mac_performance_core_count()
+        if p_count and p_count < len(groups):
+            performance = {g[0] for g in groups[-p_count:]}
+
+    return CpuTopology(cpus, groups, performance, get_cgroup_cpu_limit(cgroup_root))
+
+
+def get_pin_cpus(topology: CpuTopology, count: int) -> list:
+    """One CPU per physical core for `count` threads, performance cores first."""
+    p_cores = topology.performance_cores or topology.core_groups
+    other_cores = [g for g in topology.core_groups if g not in p_cores]
+    return [group[0] for group in (p_cores + other_cores)[:count]]
+
+
+def choose_thread_config(topology: CpuTopology, pin_threads: bool = False) -> dict:
+    """
+    Decode is memory bound and slowed by SMT siblings and E-cores, so it gets
+    one thread per physical performance core. Prompt eval is compute bound and
+    gets every physical core. Both are capped by the cgroup quota. When pinning,
+    the process is restricted to one CPU per performance core, so prompt eval
+    is capped to those as well.
+    """
+    cap = max(1, math.floor(topology.cpu_quota)) if topology.cpu_quota else len(topology.logical_cpus)
+    p_cores = topology.performance_cores or topology.core_groups
+
+    n_threads = max(1, min(len(p_cores), cap))
+    n_threads_batch = max(1, min(len(topology.core_groups), cap))
+    pin_cpus = None
+
+    if pin_threads:
+        pin_cpus = get_pin_cpus(topology, n_threads)
+        n_threads_batch = min(n_threads_batch, len(pin_cpus))
+
+    return {"n_threads": n_threads, "n_threads_batch": n_threads_batch, "pin_cpus": pin_cpus}
+
+
+def resolve_thread_config(profile_config: dict, n_threads=None, n_threads_batch=None, pin_threads=None) -> dict:
+    """
+    Detects the best thread setup, then applies overrides: explicit
+    arguments win over the profile's `n_threads`/`n_threads_batch`/`pin_threads`
+    keys, which win over detection. The pin set is built after the overrides,
+    so it always has one CPU per thread; counts beyond the usable physical
+    cores are clamped.
+    """
+    if pin_threads is None:
+        pin_threads = profile_config.get("pin_threads", False)
+    topology = detect_topology()
+    config = choose_thread_config(topology, pin_threads=pin_threads)
+
+    n_threads = n_threads or profile_config.get("n_threads")
+    n_threads_batch = n_threads_batch or profile_config.get("n_threads_batch")
+    config["n_threads"] = n_threads or config["n_threads"]
+    config["n_threads_batch"] = n_threads_batch or config["n_threads_batch"]
+
+    if pin_threads and (n_threads or n_threads_batch):
+        wanted = max(config["n_threads"], config["n_threads_batch"])
+        config["pin_cpus"] = get_pin_cpus(topology, wanted)
+        if len(config["pin_cpus"]) < wanted:
+            print(f"⚠️  Only {len(config['pin_cpus'])} physical cores to pin, "
+                  f"clamping threads from {wanted}.")
+            config["n_threads"] = min(config["n_threads"], len(config["pin_cpus"]))
+            config["n_threads_batch"] = min(config["n_threads_batch"], len(config["pin_cpus"]))
+    return config
+
+
+def apply_affinity(cpus) -> bool:
+    """Pins the process to `cpus`. Must run before the model loads so llama.cpp's threads inherit it."""
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return False
+    os.sched_setaffinity(0, cpus)
+    return True
+
+
+__all__ = [
+    "CpuTopology",
+    "detect_topology",
+    "choose_thread_config",
+    "resolve_thread_config",
+    "apply_affinity",
+]
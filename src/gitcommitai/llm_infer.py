@@ -8,9 +8,10 @@ import contextlib
 from pathlib import Path
 from llama_cpp import Llama
 
-from gitcommitai.profile_manager import get_profile_config, PROFILE_HINTS
+from gitcommitai.profile_manager import get_profile_config, load_profiles, get_thread_overrides
 from gitcommitai.diff_profiler import classify_diff_size
 from gitcommitai.cache_manager import load_cache, save_cache, is_cache_valid
+from gitcommitai.cpu_topology import resolve_thread_config, apply_affinity
 
 def get_ram_usage():
     process = psutil.Process(os.getpid())
@@ -36,13 +37,29 @@ def suppress_metal_logs():
         sys.stderr = stderr
         devnull.close()
 
-def run_llm(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers,
-            max_tokens=64, temperature=0.2, stop=["\n\n", "\nCommit", "User:"], use_mlock=True):
+@contextlib.contextmanager
+def suppress_stdout(enabled=True):
+    """Hides runtime/throughput prints (e.g. for --quiet or inside a git hook)."""
+    if not enabled:
+        yield
+        return
+    stdout = sys.stdout
+    devnull = open(os.devnull, 'w')
+    sys.stdout = devnull
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+        devnull.close()
 
+def load_model(model_path, n_ctx, n_threads, n_batch, n_gpu_layers, use_mlock=True, logits_all=False,
+               n_threads_batch=None):
+    """Loads a GGUF model and reports load time and RAM usage."""
     print("⚙️ LLM Runtime Configuration:")
     print(f"  model         : {Path(model_path).name}")
     print(f"  n_ctx         : {n_ctx}")
     print(f"  n_threads     : {n_threads}")
+    print(f"  n_threads_batch: {n_threads_batch or n_threads}")
     print(f"  n_batch       : {n_batch}")
     print(f"  n_gpu_layers  : {n_gpu_layers}")
     print(f"  use_mlock     : {use_mlock}")
@@ -54,23 +71,28 @@ def run_llm(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers,
             model_path=model_path,
             n_ctx=n_ctx,
             n_threads=n_threads,
+            n_threads_batch=n_threads_batch,
             n_batch=n_batch,
             n_gpu_layers=n_gpu_layers,
             use_mlock=use_mlock,
+            logits_all=logits_all,
             verbose=False
         )
     load_end = time.perf_counter()
 
     print(f"✅ Model loaded in {load_end - load_start:.2f} seconds")
     print(f"🧠 [After load] RAM: {get_ram_usage():.2f} MB")
+    return llm
 
-    print("🚀 Generating commit message...")
+def generate(llm, prompt_text, max_tokens=64, temperature=0.2, stop=["\n\n", "\nCommit", "User:"], **kwargs):
+    """Runs a completion on an already loaded model and returns the raw output with its duration."""
     infer_start = time.perf_counter()
-    output = llm(prompt=prompt_text, max_tokens=max_tokens, temperature=temperature, stop=stop)
+    output = llm(prompt=prompt_text, max_tokens=max_tokens, temperature=temperature, stop=stop, **kwargs)
     infer_end = time.perf_counter()
-    print(f"🧠 [After inference] RAM: {get_ram_usage():.2f} MB")
+    return output, infer_end - infer_start
 
-    duration = infer_end - infer_start
+def report_throughput(output, duration):
+    """Prints tokens/sec for a completion and returns the stripped text."""
     result = output["choices"][0]["text"].strip()
 
     tokens_used = output.get("usage", {}).get("completion_tokens", None)
@@ -80,9 +102,21 @@ def run_llm(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers,
 
     tps = tokens_used / duration if duration > 0 else 0
     print(f"✅ Inference completed in {duration:.2f} sec, estimated {tokens_used} tokens ({tps:.2f} tokens/sec)")
-
     return result
 
+def run_llm(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers,
+            max_tokens=64, temperature=0.2, stop=["\n\n", "\nCommit", "User:"], use_mlock=True,
+            n_threads_batch=None):
+
+    llm = load_model(model_path, n_ctx, n_threads, n_batch, n_gpu_layers, use_mlock=use_mlock,
+                     n_threads_batch=n_threads_batch)
+
+    print("🚀 Generating commit message...")
+    output, duration = generate(llm, prompt_text, max_tokens=max_tokens, temperature=temperature, stop=stop)
+    print(f"🧠 [After inference] RAM: {get_ram_usage():.2f} MB")
+
+    return report_throughput(output, duration)
+
 def main():
     parser = argparse.ArgumentParser(description="Generate commit message using local LLM")
 
@@ -92,7 +126,9 @@ def main():
 
     # Optional overrides
     parser.add_argument("--n_ctx", type=int, help="Context window size")
-    parser.add_argument("--n_threads", type=int, help="CPU threads")
+    parser.add_argument("--n_threads", type=int, help="CPU threads for generation")
+    parser.add_argument("--n_threads_batch", type=int, help="CPU threads for prompt eval")
+    parser.add_argument("--pin_threads", action=argparse.BooleanOptionalAction, default=None, help="Pin inference to physical performance cores")
     parser.add_argument("--n_batch", type=int, help="Batch size")
     parser.add_argument("--n_gpu_layers", type=int, help="GPU layers")
 
@@ -108,27 +144,31 @@ def main():
     diff_type = diff_profile.category
 
     # Load or infer profile
-    if is_cache_valid(cache_path, diff_type):
+    profiles = load_profiles()
+    if args.profile != "auto" and args.profile not in profiles:
+        print(f"❌ Unknown profile: {args.profile}")
+        sys.exit(1)
+
+    if is_cache_valid(cache_path, diff_type, args.profile):
         cached = load_cache(cache_path)
         profile_config = cached["profile_config"]
         print("📊 Loaded cached profile config.")
     else:
         if args.profile == "auto":
             profile_config = get_profile_config()
-        elif args.profile in PROFILE_HINTS:
-            profile_config = PROFILE_HINTS[args.profile]
         else:
-            print(f"❌ Unknown profile: {args.profile}")
-            sys.exit(1)
+            profile_config = profiles[args.profile]
 
         save_cache(cache_path, {
             "profile_config": profile_config,
+            "profile_name": args.profile,
             "diff_type": diff_type
         })
 
     # Apply overrides
     n_ctx = args.n_ctx or profile_config["n_ctx"]
-    n_threads = args.n_threads or 4
+    thread_config = resolve_thread_config(get_thread_overrides(args.profile), args.n_threads, args.n_threads_batch, args.pin_threads)
+    apply_affinity(thread_config["pin_cpus"])
     n_batch = args.n_batch or profile_config["n_batch"]
     n_gpu_layers = args.n_gpu_layers or profile_config["n_gpu_layers"]
 
@@ -142,7 +182,8 @@ def main():
         model_path=str(model_path),
         prompt_text=prompt_text,
         n_ctx=n_ctx,
-        n_threads=n_threads,
+        n_threads=thread_config["n_threads"],
+        n_threads_batch=thread_config["n_threads_batch"],
         n_batch=n_batch,
         n_gpu_layers=n_gpu_layers
     )
@@ -1,29 +1,71 @@
+import json
 import platform
+import sys
+from pathlib import Path
+
 import psutil
 
-# Predefined profiles to override automatic detection (used via --profile flag)
+# Predefined profiles to override automatic detection (used via --profile flag).
+# Optional "n_threads", "n_threads_batch" and "pin_threads" keys override CPU topology detection.
 PROFILE_HINTS = {
     "low": {"n_ctx": 256, "n_batch": 24, "n_gpu_layers": 0},
     "medium": {"n_ctx": 512, "n_batch": 42, "n_gpu_layers": 8},
     "high": {"n_ctx": 1024, "n_batch": 64, "n_gpu_layers": 16},
 }
 
-def get_profile_config() -> dict:
+# User-editable overrides merged over PROFILE_HINTS, e.g.
+# {"high": {"n_threads": 8, "pin_threads": true}, "auto": {"n_threads_batch": 12}}
+USER_PROFILES_PATH = Path(__file__).resolve().parents[1] / ".gitcommitai" / "profiles.json"
+
+THREAD_KEYS = ("n_threads", "n_threads_batch", "pin_threads")
+
+def load_profiles(profiles_path: Path = USER_PROFILES_PATH) -> dict:
+    """Returns PROFILE_HINTS with the user's profiles.json merged over it (new profile names allowed)."""
+    profiles = {name: dict(config) for name, config in PROFILE_HINTS.items()}
+    if not Path(profiles_path).exists():
+        return profiles
+
+    try:
+        with open(profiles_path, "r") as f:
+            user_profiles = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"❌ Invalid profiles file {profiles_path}: {e}")
+        sys.exit(1)
+
+    for name, overrides in user_profiles.items():
+        profiles.setdefault(name, {}).update(overrides)
+    return profiles
+
+def get_profile_config(profiles_path: Path = USER_PROFILES_PATH) -> dict:
     """Returns profile configuration based on system specs (RAM, architecture)."""
+    profiles = load_profiles(profiles_path)
     ram_gb = round(psutil.virtual_memory().total / (1024 ** 3))
     cpu_arch = platform.machine()
     is_mac = platform.system() == "Darwin"
 
     # Heuristics
     if ram_gb <= 8:
-        profile = PROFILE_HINTS["low"]
+        profile = dict(profiles["low"])
     elif ram_gb <= 16:
-        profile = PROFILE_HINTS["medium"]
+        profile = dict(profiles["medium"])
     else:
-        profile = PROFILE_HINTS["high"]
+        profile = dict(profiles["high"])
 
     # Mac with Metal tuning (e.g., for Apple Silicon)
     if is_mac and "arm" in cpu_arch.lower():
         profile["n_gpu_layers"] = 1
 
+    # User overrides for the auto-selected profile win over the tier defaults
+    profile.update(profiles.get("auto", {}))
     return profile
+
+def get_thread_overrides(profile_name: str, profiles_path: Path = USER_PROFILES_PATH) -> dict:
+    """
+    Returns the thread keys set for a profile. Read fresh on every run so
+    edits to profiles.json apply even when the profile config is cached.
+    """
+    if profile_name == "auto":
+        profile = get_profile_config(profiles_path)
+    else:
+        profile = load_profiles(profiles_path).get(profile_name, {})
+    return {key: profile[key] for key in THREAD_KEYS if key in profile}
@@ -0,0 +1,239 @@
+"""
+quant_cascade.py
+
+Generates the commit message with the smallest installed Phi-3 quant first and
+only re-runs with a larger quant when the output scores below a confidence
+threshold. Each run is recorded so the escalation rate and average latency can
+be compared with always using the biggest quant.
+"""
+
+import json
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from gitcommitai.model_downloader import PHI3_MODELS
+
+# Quant names ordered from smallest to largest, e.g. ["IQ3_S", "Q4_K_M", "Q6_K"]
+QUANT_ORDER = [key.split()[0] for key in PHI3_MODELS]
+
+DEFAULT_THRESHOLD = 0.5
+STATS_PATH = Path(__file__).resolve().parents[1] / ".gitcommitai" / "cascade_stats.json"
+
+CONVENTIONAL_RE = re.compile(
+    r"^(feat|fix|refactor|docs|style|test|chore|perf|build|ci|revert)(\([\w\-./ ]+\))?!?: \S"
+)
+GENERIC_PHRASES = ("update code", "make changes", "minor changes", "fix stuff")
+MAX_SUBJECT_LEN = 72
+
+
+@dataclass
+class CascadeAttempt:
+    quant: str
+    message: str
+    score: float
+    latency: float
+
+
+@dataclass
+class CascadeResult:
+    message: str
+    quant: str
+    score: float
+    attempts: list = field(default_factory=list)
+    baseline_quant: Optional[str] = None      # largest installed quant
+    baseline_latency: Optional[float] = None  # set only when the baseline was sampled
+
+    @property
+    def escalated(self) -> bool:
+        return len(self.attempts) > 1
+
+    @property
+    def latency(self) -> float:
+        return sum(a.latency for a in self.attempts)
+
+
+def model_path_for(model_dir: Path, quant: str) -> Path:
+    return Path(model_dir) / f"Phi-3-mini-4k-instruct-{quant}.gguf"
+
+
+def get_installed_quants(model_dir: Path) -> list:
+    """Returns installed quant names ordered from smallest to largest."""
+    return [q for q in QUANT_ORDER if model_path_for(model_dir, q).exists()]
+
+
+def format_score(message: str) -> float:
+    """Scores the commit message format between 0 and 1 using cheap rule checks."""
+    lines = message.strip().splitlines()
+    if not lines:
+        return 0.0
+
+    subject = lines[0].strip()
+    checks = [
+        bool(CONVENTIONAL_RE.match(subject)),
+        len(subject) <= MAX_SUBJECT_LEN,
+        not any(p in subject.lower() for p in GENERIC_PHRASES),
+        not subject.endswith("."),
+    ]
+    # A missing Conventional Commits prefix is a hard failure
+    if not checks[0]:
+        return 0.0
+    return sum(checks) / len(checks)
+
+
+def confidence_score(token_logprobs) -> float:
+    """Returns exp(mean token logprob), i.e. the geometric mean token probability."""
+    values = [lp for lp in (token_logprobs or []) if lp is not None]
+    if not values:
+        return 0.0
+    return math.exp(sum(values) / len(values))
+
+
+def score_message(message: str, token_logprobs) -> float:
+    return confidence_score(token_logprobs) * format_score(message)
+
+
+def run_quant(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers, n_threads_batch=None):
+    """Loads one quant, generates with logprobs and returns (message, token_logprobs)."""
+    from gitcommitai.llm_infer import load_model, generate, report_throughput
+
+    llm = load_model(str(model_path), n_ctx, n_threads, n_batch, n_gpu_layers, logits_all=True,
+                     n_threads_batch=n_threads_batch)
+    output, duration = generate(llm, prompt_text, logprobs=1)
+    message = report_throughput(output, duration)
+    logprobs = output["choices"][0].get("logprobs") or {}
+    return message, logprobs.get("token_logprobs", [])
+
+
+def run_cascade(prompt_text: str, model_dir: Path, n_ctx: int, n_threads: int, n_batch: int,
+                n_gpu_layers: int, threshold: float = DEFAULT_THRESHOLD,
+                runner: Optional[Callable] = None, n_threads_batch: Optional[int] = None,
+                sample_baseline: bool = False, quiet: bool = False) -> CascadeResult:
+    """
+    Tries installed quants from smallest to largest and stops at the first
+    output whose score reaches `threshold`. If none does, the best-scoring
+    attempt is returned.
+
+    With `sample_baseline`, the largest installed quant is also timed on this
+    diff (unless the cascade already ran it), so the always-big latency is
+    sampled independently of whether the cascade escalated. `quiet` hides
+    the per-attempt progress lines.
+    """
+    runner = runner or run_quant
+    quants = get_installed_quants(model_dir)
+    if not quants:
+        raise FileNotFoundError(f"❌ No Phi-3 quants installed in {model_dir}")
+
+    def timed_run(quant):
+        start = time.perf_counter()
+        message, token_logprobs = runner(
+            model_path_for(model_dir, quant), prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers,
+            n_threads_batch=n_threads_batch
+        )
+        return message, token_logprobs, time.perf_counter() - start
+
+    attempts = []
+    for quant in quants:
+        if not quiet:
+            print(f"🪜 Cascade: trying {quant}...")
+        message, token_logprobs, latency = timed_run(quant)
+        score = score_message(message, token_logprobs)
+        attempts.append(CascadeAttempt(quant, message, score, latency))
+        if not quiet:
+            print(f"  score {score:.2f} (threshold {threshold:.2f}) in {latency:.2f} sec")
+
+        if score >= threshold:
+            break
+
+    best = attempts[-1] if attempts[-1].score >= threshold else max(attempts, key=lambda a: a.score)
+    result = CascadeResult(best.message, best.quant, best.score, attempts, baseline_quant=quants[-1])
+
+    if sample_baseline:
+        ran_baseline = [a for a in attempts if a.quant == result.baseline_quant]
+        if ran_baseline:
+            result.baseline_latency = ran_baseline[0].latency
+        else:
+            if not quiet:
+                print(f"📏 Sampling {result.baseline_quant} baseline...")
+            result.baseline_latency = timed_run(result.baseline_quant)[2]
+
+    return result
+
+
+def load_stats(stats_path: Path = STATS_PATH) -> dict:
+    stats = {"runs": 0, "escalations": 0, "total_latency": 0.0,
+             "baseline_runs": 0, "baseline_total_latency": 0.0, "baseline_cascade_total_latency": 0.0,
+             "baseline_quant": None}
+    if Path(stats_path).exists():
+        with open(stats_path, "r") as f:
+            stats.update(json.load(f))
+    return stats
+
+
+def record_run(result: CascadeResult, stats_path: Path = STATS_PATH) -> dict:
+    """
+    Adds a cascade run to the stats file. Runs with a sampled baseline also
+    record the cascade latency on the same diff, giving a paired comparison.
+    """
+    stats = load_stats(stats_path)
+    stats["runs"] += 1
+    stats["escalations"] += int(result.escalated)
+    stats["total_latency"] += result.latency
+
+    if result.baseline_latency is not None:
+        if stats["baseline_quant"] != result.baseline_quant:
+            # The largest installed quant changed, older samples are not comparable
+            stats.update({"baseline_runs": 0, "baseline_total_latency": 0.0,
+                          "baseline_cascade_total_latency": 0.0})
+        stats["baseline_quant"] = result.baseline_quant
+        stats["baseline_runs"] += 1
+        stats["baseline_total_latency"] += result.baseline_latency
+        stats["baseline_cascade_total_latency"] += result.latency
+
+    Path(stats_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(stats_path, "w") as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def summarize_stats(stats: dict) -> dict:
+    runs = stats["runs"]
+    baseline_runs = stats["baseline_runs"]
+    return {
+        "runs": runs,
+        "escalation_rate": stats["escalations"] / runs if runs else 0.0,
+        "avg_latency": stats["total_latency"] / runs if runs else 0.0,
+        "baseline_quant": stats["baseline_quant"],
+        "baseline_runs": baseline_runs,
+        "avg_baseline_latency": stats["baseline_total_latency"] / baseline_runs if baseline_runs else None,
+        "avg_sampled_cascade_latency": (
+            stats["baseline_cascade_total_latency"] / baseline_runs if baseline_runs else None
+        ),
+    }
+
+
+def print_stats(stats: dict, quiet: bool = False):
+    if quiet:
+        return
+    summary = summarize_stats(stats)
+    print(f"📈 Cascade: {summary['escalation_rate']:.0%} escalation rate over {summary['runs']} run(s), "
+          f"avg {summary['avg_latency']:.2f} sec")
+    if summary["avg_baseline_latency"] is None:
+        print("  no baseline sample yet (run with --cascade-sample-baseline)")
+    else:
+        print(f"  on {summary['baseline_runs']} sampled run(s): cascade {summary['avg_sampled_cascade_latency']:.2f} sec "
+              f"vs {summary['avg_baseline_latency']:.2f} sec always using {summary['baseline_quant']}")
+
+
+__all__ = [
+    "QUANT_ORDER",
+    "CascadeResult",
+    "get_installed_quants",
+    "score_message",
+    "run_cascade",
+    "record_run",
+    "summarize_stats",
+]
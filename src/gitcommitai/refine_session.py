@@ -0,0 +1,157 @@
+"""
+refine_session.py
+
+Interactive regenerate/refine loop that keeps a loaded Llama instance alive.
+Every turn reuses the diff prompt as an unchanged prefix, so llama.cpp can
+keep its evaluated KV cache for it and only decode the new instruction and
+the output.
+"""
+
+import random
+import time
+from typing import Optional
+
+from gitcommitai.commit_write import preview_message, edit_message_interactively
+
+PROMPT_SUFFIX = "Commit message:"
+DEFAULT_STOP = ["\n\n", "\nCommit", "User:"]
+BODY_STOP = ["\nCommit", "User:"]
+
+MENU = "[a]ccept (Enter)  [r]egenerate  [s]horter  [b]ody  scope <name>  [e]dit  [q]uit"
+
+
+def split_prompt(prompt_text: str) -> str:
+    """Returns the prompt without its trailing 'Commit message:' so turns can share it as a prefix."""
+    prompt_text = prompt_text.rstrip()
+    if prompt_text.endswith(PROMPT_SUFFIX):
+        prompt_text = prompt_text[: -len(PROMPT_SUFFIX)]
+    return prompt_text.rstrip()
+
+
+class RefineSession:
+    """Holds a loaded model and the shared diff prefix across refinement turns."""
+
+    def __init__(self, llm, prompt_text: str, max_tokens=64, temperature=0.2):
+        self.llm = llm
+        self.prefix = split_prompt(prompt_text)
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.message = ""
+        self.last_prompt = None
+        self.last_options = {}
+
+    def build_prompt(self, instruction: Optional[str] = None) -> str:
+        if not instruction:
+            return f"{self.prefix}\n\n{PROMPT_SUFFIX}"
+        return (
+            f"{self.prefix}\n\n"
+            f"Previous commit message:\n{self.message}\n\n"
+            f"Instruction: {instruction}\n"
+            f"{PROMPT_SUFFIX}"
+        )
+
+    def _run(self, prompt: str, **options):
+        params = {"max_tokens": self.max_tokens, "temperature": self.temperature, "stop": DEFAULT_STOP}
+        params.update(options)
+
+        start = time.perf_counter()
+        output = self.llm(prompt=prompt, **params)
+        latency = time.perf_counter() - start
+
+        message = output["choices"][0]["text"].strip()
+        if message:
+            self.message = message
+        self.last_prompt = prompt
+        self.last_options = options
+
+        tokens = output.get("usage", {}).get("completion_tokens")
+        token_info = f", {tokens} tokens" if tokens is not None else ""
+        print(f"⏱️  Turn took {latency:.2f} sec{token_info}")
+        return self.message, latency
+
+    def generate(self):
+        return self._run(self.build_prompt())
+
+    def regenerate(self):
+        """Samples the previous prompt again with more randomness."""
+        options = dict(self.last_options)
+        options.update({"temperature": max(self.temperature, 0.8), "seed": random.randint(0, 2**31 - 1)})
+        return self._run(self.last_prompt or self.build_prompt(), **options)
+
+    def shorter(self):
+        return self._run(self.build_prompt(
+            "Rewrite it as a single, shorter subject line (under 50 characters)."
+        ))
+
+    def add_body(self):
+        return self._run(
+            self.build_prompt(
+                "Keep the subject line, then add a blank line and a short body "
+                "(1-3 bullet points) explaining what changed and why."
+            ),
+            max_tokens=self.max_tokens * 3,
+            stop=BODY_STOP,
+        )
+
+    def use_scope(self, scope: str):
+        return self._run(self.build_prompt(
+            f'Use the Conventional Commits scope "{scope}", e.g. "type({scope}): subject".'
+        ))
+
+
+def _run_turn(action, *args) -> bool:
+    """
+    Runs one turn, keeping the session alive on failure. llama.cpp raises
+    ValueError once the growing prompt no longer fits in n_ctx.
+    """
+    try:
+        action(*args)
+        return True
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ Turn failed, keeping the previous message: {e}")
+        return False
+
+
+def interactive_refine(session: RefineSession) -> Optional[str]:
+    """
+    Runs the refine loop. Returns the accepted message, or None if the
+    user quits.
+    """
+    if not session.message:
+        print("🚀 Generating commit message...")
+        _run_turn(session.generate)
+
+    while True:
+        preview_message(session.message)
+        print(f"\n{MENU}")
+        try:
+            choice = input("> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            # Ctrl-D / Ctrl-C at the prompt means quit, not a traceback
+            print("\n❌ Refine cancelled.")
+            return None
+        command, _, arg = choice.partition(" ")
+        command = command.lower()
+
+        if command in ("a", "accept", ""):
+            if session.message.strip():
+                return session.message
+            print("❌ Commit message is empty, regenerate or edit it first.")
+        elif command in ("q", "quit"):
+            return None
+        elif command in ("r", "regenerate"):
+            _run_turn(session.regenerate)
+        elif command in ("s", "shorter"):
+            _run_turn(session.shorter)
+        elif command in ("b", "body"):
+            _run_turn(session.add_body)
+        elif command == "scope" and arg.strip():
+            _run_turn(session.use_scope, arg.strip())
+        elif command in ("e", "edit"):
+            edited = edit_message_interactively(session.message)
+            if edited:
+                session.message = edited
+            else:
+                print("❌ Edited message is empty, keeping the previous one.")
+        else:
+            print(f"❌ Unknown option: {choice}")
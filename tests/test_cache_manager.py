@@ -0,0 +1,18 @@
+from gitcommitai.cache_manager import save_cache, is_cache_valid
+
+def test_cache_is_tied_to_profile_name(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    save_cache(cache_path, {
+        "profile_config": {"n_ctx": 1024, "quant": "Q4_K_M"},
+        "profile_name": "high",
+        "diff_type": "small"
+    })
+    assert is_cache_valid(cache_path, "small", "high")
+    assert not is_cache_valid(cache_path, "small", "auto")
+    assert not is_cache_valid(cache_path, "large", "high")
+
+def test_cache_without_profile_name_is_invalid_for_named_profiles(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    save_cache(cache_path, {"profile_config": {"quant": "Q4_K_M"}, "diff_type": "small"})
+    assert not is_cache_valid(cache_path, "small", "auto")
+    assert not is_cache_valid(tmp_path / "missing.json", "small")
@@ -0,0 +1,165 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from gitcommitai.commit_write import write_commit_msg_file, run_plumbing_commit
+
+def git(*args):
+    return subprocess.check_output(["git", *args], text=True).strip()
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    git("config", "user.name", "test")
+    git("config", "user.email", "test@example.com")
+    return tmp_path
+
+def stage(repo, name):
+    (repo / name).write_text(name)
+    git("add", name)
+
+def test_write_commit_msg_file_keeps_git_comments(tmp_path):
+    msg_file = tmp_path / "COMMIT_EDITMSG"
+    msg_file.write_text("\n# Please enter the commit message\n# On branch main\n")
+    assert write_commit_msg_file("feat: add hook mode", msg_file, "template")
+    assert msg_file.read_text() == "feat: add hook mode\n\n# Please enter the commit message\n# On branch main\n"
+
+@pytest.mark.parametrize("source", ["message", "merge", "squash", "commit"])
+def test_write_commit_msg_file_respects_user_message(tmp_path, source):
+    msg_file = tmp_path / "COMMIT_EDITMSG"
+    msg_file.write_text("fix: typed by the user\n")
+    assert not write_commit_msg_file("feat: generated", msg_file, source)
+    assert msg_file.read_text() == "fix: typed by the user\n"
+
+def test_plumbing_commit_root_and_child(repo):
+    stage(repo, "a.txt")
+    first = run_plumbing_commit("feat: first")
+    stage(repo, "b.txt")
+    second = run_plumbing_commit("fix: second\n\n- body line")
+
+    assert git("rev-parse", "HEAD") == second
+    assert git("rev-parse", "HEAD~1") == first
+    assert git("log", "-1", "--format=%B") == "fix: second\n\n- body line"
+    assert git("ls-tree", "--name-only", "HEAD").split() == ["a.txt", "b.txt"]
+    assert git("status", "--porcelain") == ""
+
+def test_plumbing_commit_skips_hooks(repo):
+    hook = repo / ".git" / "hooks" / "pre-commit"
+    hook.write_text("#!/bin/sh\nexit 1\n")
+    hook.chmod(0o755)
+    stage(repo, "a.txt")
+    run_plumbing_commit("feat: bypass hooks")
+    assert git("log", "-1", "--format=%s") == "feat: bypass hooks"
+
+def test_plumbing_commit_refuses_empty_index(repo):
+    stage(repo, "a.txt")
+    first = run_plumbing_commit("feat: first")
+    assert run_plumbing_commit("feat: nothing new") is None
+    assert git("rev-parse", "HEAD") == first
+
+@pytest.mark.parametrize("message", ["", "  \n\n"])
+def test_plumbing_commit_refuses_empty_message(repo, message):
+    stage(repo, "a.txt")
+    assert run_plumbing_commit(message) is None
+    assert subprocess.run(["git", "rev-parse", "--verify", "-q", "HEAD"]).returncode != 0
+
+def test_plumbing_commit_refuses_during_merge(repo):
+    stage(repo, "a.txt")
+    first = run_plumbing_commit("feat: first")
+    (repo / ".git" / "MERGE_HEAD").write_text(first + "\n")
+    stage(repo, "b.txt")
+    assert run_plumbing_commit("feat: merge") is None
+    assert git("rev-parse", "HEAD") == first
+
+def test_shipped_hook_fails_open(repo, monkeypatch):
+    # gitcommitai is not importable from the hook here, so the CLI fails
+    monkeypatch.delenv("PYTHONPATH", raising=False)
+    hook = repo / ".git" / "hooks" / "prepare-commit-msg"
+    shutil.copy(Path(__file__).resolve().parents[1] / "hooks" / "prepare-commit-msg", hook)
+    hook.chmod(0o755)
+    stage(repo, "a.txt")
+    subprocess.check_call(["git", "commit", "-q", "-m", "fix: typed by hand"])
+    assert git("log", "-1", "--format=%s") == "fix: typed by hand"
+
+def test_plumbing_commit_refuses_empty_root_commit(repo):
+    assert run_plumbing_commit("feat: empty root") is None
+    assert subprocess.run(["git", "rev-parse", "--verify", "-q", "HEAD"]).returncode != 0
+
+@pytest.mark.parametrize("state", ["REBASE_HEAD", "rebase-merge", "rebase-apply"])
+def test_plumbing_commit_refuses_during_rebase(repo, state):
+    stage(repo, "a.txt")
+    first = run_plumbing_commit("feat: first")
+    if state == "REBASE_HEAD":
+        (repo / ".git" / state).write_text(first + "\n")
+    else:
+        (repo / ".git" / state).mkdir()
+    stage(repo, "b.txt")
+    assert run_plumbing_commit("feat: mid rebase") is None
+    assert git("rev-parse", "HEAD") == first
+
+def test_plumbing_commit_reports_git_failures(repo, capsys):
+    # Unmerged index entries make `git write-tree` fail
+    blob = subprocess.check_output(["git", "hash-object", "-w", "--stdin"], input="x\n", text=True).strip()
+    subprocess.run(["git", "update-index", "--index-info"], check=True, text=True,
+                   input=f"100644 {blob} 1\tc.txt\n100644 {blob} 2\tc.txt\n")
+    assert run_plumbing_commit("feat: conflicted") is None
+    assert "❌" in capsys.readouterr().out
+
+def test_write_commit_msg_file_keeps_verbose_diff(tmp_path):
+    msg_file = tmp_path / "COMMIT_EDITMSG"
+    msg_file.write_text(
+        "\n# Please enter the commit message\n"
+        "# ------------------------ >8 ------------------------\n"
+        "# Do not modify or remove the line above.\n"
+        "diff --git a/x b/x\n+hello\n"
+    )
+    assert write_commit_msg_file("feat: verbose", msg_file, None)
+    assert msg_file.read_text() == (
+        "feat: verbose\n\n# Please enter the commit message\n"
+        "# ------------------------ >8 ------------------------\n"
+        "# Do not modify or remove the line above.\n"
+        "diff --git a/x b/x\n+hello\n"
+    )
+
+def test_write_commit_msg_file_uses_core_comment_char(repo):
+    git("config", "core.commentChar", ";")
+    msg_file = repo / "COMMIT_EDITMSG"
+    msg_file.write_text("\n; Please enter the commit message\n; On branch main\n")
+    assert write_commit_msg_file("feat: semicolons", msg_file, "template")
+    assert msg_file.read_text() == "feat: semicolons\n\n; Please enter the commit message\n; On branch main\n"
+
+def test_hook_native_commit_with_verbose(repo):
+    hook = repo / ".git" / "hooks" / "prepare-commit-msg"
+    src = Path(__file__).resolve().parents[1] / "src"
+    hook.write_text(
+        f'#!/bin/sh\nPYTHONPATH="{src}" "{sys.executable}" -c '
+        '"import sys; from gitcommitai.commit_write import write_commit_msg_file; '
+        'write_commit_msg_file(\'feat: from hook\', sys.argv[1])" "$1"\n'
+    )
+    hook.chmod(0o755)
+    stage(repo, "a.txt")
+    subprocess.check_call(["git", "-c", "core.editor=true", "commit", "-q", "-v"])
+    assert git("log", "-1", "--format=%B") == "feat: from hook"
+
+def test_shipped_hook_uses_python3(repo, tmp_path, monkeypatch):
+    # A python3-only system: record how the hook invokes the interpreter
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls.txt"
+    fake = bin_dir / "python3"
+    fake.write_text(f'#!/bin/sh\necho "$@" > "{calls}"\n')
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.delenv("GITCOMMITAI_PYTHON", raising=False)
+
+    hook = repo / ".git" / "hooks" / "prepare-commit-msg"
+    shutil.copy(Path(__file__).resolve().parents[1] / "hooks" / "prepare-commit-msg", hook)
+    hook.chmod(0o755)
+    stage(repo, "a.txt")
+    subprocess.check_call(["git", "commit", "-q", "-m", "fix: typed by hand"])
+    assert calls.read_text().split() == [
+        "-m", "gitcommitai.cli", "--hook-file", ".git/COMMIT_EDITMSG", "--hook-source", "message", "--quiet"
+    ]
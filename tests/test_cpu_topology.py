@@ -0,0 +1,144 @@
+import pytest
+from gitcommitai import cpu_topology
+from gitcommitai.cpu_topology import (
+    CpuTopology,
+    parse_cpu_list,
+    get_cgroup_cpu_limit,
+    get_core_groups,
+    get_performance_cpus,
+    choose_thread_config,
+    resolve_thread_config,
+)
+from gitcommitai.profile_manager import PROFILE_HINTS, load_profiles, get_thread_overrides
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+@pytest.fixture
+def hybrid_sysfs(tmp_path):
+    """4 SMT P-cores (cpus 0-7, siblings n/n+1) and 4 E-cores (cpus 8-11)."""
+    root = tmp_path / "devices"
+    for cpu in range(12):
+        siblings = f"{cpu - cpu % 2}-{cpu - cpu % 2 + 1}" if cpu < 8 else str(cpu)
+        write(root / "system" / "cpu" / f"cpu{cpu}" / "topology" / "thread_siblings_list", siblings)
+    write(root / "cpu_core" / "cpus", "0-7")
+    write(root / "cpu_atom" / "cpus", "8-11")
+    return root
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("0-3", [0, 1, 2, 3]), ("0,2,4", [0, 2, 4]), ("0-1,8,10-11\n", [0, 1, 8, 10, 11])]
+)
+def test_parse_cpu_list(text, expected):
+    assert parse_cpu_list(text) == expected
+
+@pytest.mark.parametrize(
+    "files, expected",
+    [
+        ({"cpu.max": "max 100000"}, None),
+        ({"cpu.max": "250000 100000"}, 2.5),
+        ({"cpu/cpu.cfs_quota_us": "400000", "cpu/cpu.cfs_period_us": "100000"}, 4.0),
+        ({"cpu/cpu.cfs_quota_us": "-1", "cpu/cpu.cfs_period_us": "100000"}, None),
+        ({}, None),
+    ]
+)
+def test_get_cgroup_cpu_limit(tmp_path, files, expected):
+    for name, text in files.items():
+        write(tmp_path / name, text)
+    assert get_cgroup_cpu_limit(tmp_path, tmp_path / "no_proc_cgroup") == expected
+
+def test_hybrid_detection(hybrid_sysfs):
+    groups = get_core_groups(list(range(12)), hybrid_sysfs)
+    assert len(groups) == 8
+    assert groups[0] == [0, 1]
+    assert get_performance_cpus(hybrid_sysfs) == set(range(8))
+
+def test_non_hybrid_has_no_performance_set(tmp_path):
+    assert get_performance_cpus(tmp_path) is None
+
+def test_choose_threads_on_hybrid(hybrid_sysfs):
+    groups = get_core_groups(list(range(12)), hybrid_sysfs)
+    topology = CpuTopology(list(range(12)), groups, get_performance_cpus(hybrid_sysfs), None)
+
+    config = choose_thread_config(topology)
+    assert config == {"n_threads": 4, "n_threads_batch": 8, "pin_cpus": None}
+
+    pinned = choose_thread_config(topology, pin_threads=True)
+    assert pinned["pin_cpus"] == [0, 2, 4, 6]
+    assert pinned["n_threads_batch"] == 4
+
+def test_choose_threads_respects_cgroup_quota():
+    groups = [[i, i + 32] for i in range(32)]
+    topology = CpuTopology(list(range(64)), groups, None, 2.5)
+    assert choose_thread_config(topology) == {"n_threads": 2, "n_threads_batch": 2, "pin_cpus": None}
+
+def test_profile_and_flag_overrides(monkeypatch):
+    topology = CpuTopology(list(range(8)), [[i] for i in range(8)], None, None)
+    monkeypatch.setattr(cpu_topology, "detect_topology", lambda: topology)
+
+    assert resolve_thread_config({})["n_threads"] == 8
+    profile = {"n_threads": 3, "n_threads_batch": 6}
+    assert resolve_thread_config(profile)["n_threads_batch"] == 6
+    assert resolve_thread_config(profile, n_threads=5)["n_threads"] == 5
+
+def test_cgroup_v2_walks_up_from_own_cgroup(tmp_path):
+    # Host cgroup namespace: the limit sits on a parent slice, not the mount root
+    proc = tmp_path / "proc_cgroup"
+    write(proc, "0::/build.slice/job-42.scope\n")
+    root = tmp_path / "cgroup"
+    write(root / "cpu.max", "max 100000")
+    write(root / "build.slice" / "cpu.max", "400000 100000")
+    write(root / "build.slice" / "job-42.scope" / "cpu.max", "max 100000")
+    assert get_cgroup_cpu_limit(root, proc) == 4.0
+
+def test_cgroup_smallest_quota_wins(tmp_path):
+    proc = tmp_path / "proc_cgroup"
+    write(proc, "0::/a/b\n")
+    root = tmp_path / "cgroup"
+    write(root / "a" / "cpu.max", "200000 100000")
+    write(root / "a" / "b" / "cpu.max", "600000 100000")
+    assert get_cgroup_cpu_limit(root, proc) == 2.0
+
+def test_cgroup_v1_uses_cpu_controller_path(tmp_path):
+    proc = tmp_path / "proc_cgroup"
+    write(proc, "4:memory:/docker/abc\n3:cpu,cpuacct:/docker/abc\n")
+    mount = tmp_path / "cgroup" / "cpu,cpuacct"
+    write(mount / "docker" / "abc" / "cpu.cfs_quota_us", "150000")
+    write(mount / "docker" / "abc" / "cpu.cfs_period_us", "100000")
+    assert get_cgroup_cpu_limit(tmp_path / "cgroup", proc) == 1.5
+
+def test_profiles_json_overrides_threads(tmp_path):
+    profiles_path = tmp_path / "profiles.json"
+    profiles_path.write_text('{"high": {"n_threads": 6, "pin_threads": true}, "ci": {"n_ctx": 512, "n_batch": 32}}')
+
+    profiles = load_profiles(profiles_path)
+    assert profiles["high"]["n_ctx"] == 1024 and profiles["high"]["n_threads"] == 6
+    assert profiles["ci"] == {"n_ctx": 512, "n_batch": 32}
+    assert PROFILE_HINTS["high"].get("n_threads") is None
+    assert get_thread_overrides("high", profiles_path) == {"n_threads": 6, "pin_threads": True}
+
+def test_pin_flag_false_overrides_profile(monkeypatch):
+    topology = CpuTopology(list(range(8)), [[i] for i in range(8)], None, None)
+    monkeypatch.setattr(cpu_topology, "detect_topology", lambda: topology)
+    assert resolve_thread_config({"pin_threads": True})["pin_cpus"] is not None
+    assert resolve_thread_config({"pin_threads": True}, pin_threads=False)["pin_cpus"] is None
+
+@pytest.mark.parametrize(
+    "profile, flags, expected",
+    [
+        # Override within the core count: one pinned CPU per thread, P-cores first
+        ({"n_threads": 6, "pin_threads": True}, {}, {"n_threads": 6, "n_threads_batch": 4, "pin_cpus": [0, 2, 4, 6, 8, 9]}),
+        ({"pin_threads": True}, {"n_threads_batch": 5}, {"n_threads": 4, "n_threads_batch": 5, "pin_cpus": [0, 2, 4, 6, 8]}),
+        # Override beyond the physical cores is clamped to the pinned set
+        ({"n_threads": 16, "pin_threads": True}, {}, {"n_threads": 8, "n_threads_batch": 4, "pin_cpus": [0, 2, 4, 6, 8, 9, 10, 11]}),
+    ]
+)
+def test_pinning_follows_thread_overrides(monkeypatch, hybrid_sysfs, profile, flags, expected):
+    groups = get_core_groups(list(range(12)), hybrid_sysfs)
+    topology = CpuTopology(list(range(12)), groups, get_performance_cpus(hybrid_sysfs), None)
+    monkeypatch.setattr(cpu_topology, "detect_topology", lambda: topology)
+
+    config = resolve_thread_config(profile, **flags)
+    assert config == expected
+    assert len(config["pin_cpus"]) >= max(config["n_threads"], config["n_threads_batch"])
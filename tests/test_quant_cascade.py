@@ -0,0 +1,125 @@
+import math
+
+import pytest
+from gitcommitai.quant_cascade import (
+    QUANT_ORDER,
+    get_installed_quants,
+    score_message,
+    run_cascade,
+    record_run,
+    summarize_stats,
+    print_stats,
+)
+
+@pytest.fixture
+def model_dir(tmp_path):
+    for quant in QUANT_ORDER:
+        (tmp_path / f"Phi-3-mini-4k-instruct-{quant}.gguf").touch()
+    return tmp_path
+
+def make_runner(outputs):
+    """Fake runner returning (message, token_logprobs) per quant and recording calls."""
+    calls = []
+    def _runner(model_path, prompt_text, n_ctx, n_threads, n_batch, n_gpu_layers, **kwargs):
+        quant = model_path.stem.split("-")[-1]
+        calls.append(quant)
+        return outputs[quant]
+    _runner.calls = calls
+    return _runner
+
+CONFIDENT = [math.log(0.9)] * 5
+UNSURE = [math.log(0.2)] * 5
+
+def test_get_installed_quants_orders_smallest_first(tmp_path):
+    (tmp_path / "Phi-3-mini-4k-instruct-Q6_K.gguf").touch()
+    (tmp_path / "Phi-3-mini-4k-instruct-IQ3_S.gguf").touch()
+    assert get_installed_quants(tmp_path) == ["IQ3_S", "Q6_K"]
+
+@pytest.mark.parametrize(
+    "message, logprobs, expected_pass",
+    [
+        ("feat: add cascade mode", CONFIDENT, True),
+        ("feat(cli): add cascade mode", CONFIDENT, True),
+        ("feat: add cascade mode", UNSURE, False),
+        ("Added cascade mode", CONFIDENT, False),
+        ("", CONFIDENT, False),
+        ("feat: add cascade mode", [], False),
+    ]
+)
+def test_score_message(message, logprobs, expected_pass):
+    assert (score_message(message, logprobs) >= 0.5) == expected_pass
+
+def test_cascade_stops_at_small_quant_when_confident(model_dir):
+    runner = make_runner({"IQ3_S": ("fix: handle empty diff", CONFIDENT)})
+    result = run_cascade("prompt", model_dir, 256, 4, 42, 0, runner=runner)
+    assert runner.calls == ["IQ3_S"]
+    assert result.quant == "IQ3_S"
+    assert not result.escalated
+
+def test_cascade_escalates_on_low_confidence(model_dir):
+    runner = make_runner({
+        "IQ3_S": ("updated stuff", CONFIDENT),
+        "Q4_K_M": ("fix: handle empty diff", CONFIDENT),
+    })
+    result = run_cascade("prompt", model_dir, 256, 4, 42, 0, runner=runner)
+    assert runner.calls == ["IQ3_S", "Q4_K_M"]
+    assert result.quant == "Q4_K_M"
+    assert result.escalated
+
+def test_cascade_returns_best_when_nothing_passes(model_dir):
+    runner = make_runner({
+        "IQ3_S": ("fix: a", UNSURE),
+        "Q4_K_M": ("nope", CONFIDENT),
+        "Q6_K": ("fix: b", [math.log(0.4)] * 5),
+    })
+    result = run_cascade("prompt", model_dir, 256, 4, 42, 0, runner=runner)
+    assert len(result.attempts) == 3
+    assert result.message == "fix: b"
+
+def test_cascade_without_models_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run_cascade("prompt", tmp_path, 256, 4, 42, 0, runner=make_runner({}))
+
+def test_record_run_without_sampling_has_no_baseline(model_dir, tmp_path):
+    stats_path = tmp_path / "stats.json"
+    full = run_cascade("p", model_dir, 256, 4, 42, 0, runner=make_runner({
+        "IQ3_S": ("x", CONFIDENT), "Q4_K_M": ("y", CONFIDENT), "Q6_K": ("fix: a thing", CONFIDENT),
+    }))
+    small = run_cascade("p", model_dir, 256, 4, 42, 0,
+                        runner=make_runner({"IQ3_S": ("fix: a thing", CONFIDENT)}))
+    record_run(full, stats_path)
+    summary = summarize_stats(record_run(small, stats_path))
+    assert summary["runs"] == 2
+    assert summary["escalation_rate"] == 0.5
+    assert summary["avg_baseline_latency"] is None
+
+def test_sample_baseline_uses_largest_installed_quant(tmp_path):
+    # Default download: IQ3_S and Q4_K_M only
+    for quant in ("IQ3_S", "Q4_K_M"):
+        (tmp_path / f"Phi-3-mini-4k-instruct-{quant}.gguf").touch()
+    runner = make_runner({"IQ3_S": ("fix: a thing", CONFIDENT), "Q4_K_M": ("fix: a thing", CONFIDENT)})
+    result = run_cascade("p", tmp_path, 256, 4, 42, 0, runner=runner, sample_baseline=True)
+
+    assert runner.calls == ["IQ3_S", "Q4_K_M"]
+    assert not result.escalated
+    assert result.baseline_quant == "Q4_K_M"
+    assert result.baseline_latency is not None
+
+    summary = summarize_stats(record_run(result, tmp_path / "stats.json"))
+    assert summary["baseline_quant"] == "Q4_K_M"
+    assert summary["baseline_runs"] == 1
+
+def test_sample_baseline_reuses_escalated_attempt(model_dir):
+    runner = make_runner({
+        "IQ3_S": ("x", CONFIDENT), "Q4_K_M": ("y", CONFIDENT), "Q6_K": ("fix: a thing", CONFIDENT),
+    })
+    result = run_cascade("p", model_dir, 256, 4, 42, 0, runner=runner, sample_baseline=True)
+    assert runner.calls == ["IQ3_S", "Q4_K_M", "Q6_K"]
+    assert result.baseline_latency == result.attempts[-1].latency
+
+def test_quiet_cascade_prints_nothing(model_dir, tmp_path, capsys):
+    runner = make_runner({"IQ3_S": ("feat: add hello", CONFIDENT), "Q6_K": ("feat: add hello", CONFIDENT)})
+    result = run_cascade("p", model_dir, 256, 4, 42, 0, runner=runner, sample_baseline=True, quiet=True)
+    print_stats(record_run(result, tmp_path / "stats.json"), quiet=True)
+    assert runner.calls == ["IQ3_S", "Q6_K"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,90 @@
+import pytest
+from gitcommitai.refine_session import RefineSession, interactive_refine, split_prompt
+
+PROMPT = "Write a commit message.\n\ndiff --git a/x b/x\n+hello\n\nCommit message:"
+
+class FakeLlama:
+    """Returns queued completions and records every call."""
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.calls = []
+
+    def __call__(self, prompt, **kwargs):
+        self.calls.append({"prompt": prompt, **kwargs})
+        return {"choices": [{"text": self.texts.pop(0)}], "usage": {"completion_tokens": 5}}
+
+@pytest.fixture
+def mock_input(monkeypatch):
+    def _mock_input(inputs):
+        input_iter = iter(inputs)
+        monkeypatch.setattr("builtins.input", lambda _: next(input_iter))
+    return _mock_input
+
+def test_split_prompt_strips_suffix():
+    assert split_prompt(PROMPT).endswith("+hello")
+
+def test_every_turn_shares_the_diff_prefix():
+    llm = FakeLlama(["feat: add hello", "feat: hello", "feat(x): hello"])
+    session = RefineSession(llm, PROMPT)
+    session.generate()
+    session.shorter()
+    session.use_scope("x")
+
+    prefix = split_prompt(PROMPT)
+    assert all(call["prompt"].startswith(prefix) for call in llm.calls)
+    assert "Previous commit message:\nfeat: hello" in llm.calls[2]["prompt"]
+    assert session.message == "feat(x): hello"
+
+def test_add_body_allows_blank_lines():
+    llm = FakeLlama(["feat: add hello", "feat: add hello\n\n- greet users"])
+    session = RefineSession(llm, PROMPT)
+    session.generate()
+    session.add_body()
+    assert "\n\n" not in llm.calls[1]["stop"]
+    assert llm.calls[1]["max_tokens"] > llm.calls[0]["max_tokens"]
+
+def test_regenerate_reuses_last_prompt_with_new_seed():
+    llm = FakeLlama(["feat: a", "feat: b"])
+    session = RefineSession(llm, PROMPT)
+    session.generate()
+    session.regenerate()
+    assert llm.calls[1]["prompt"] == llm.calls[0]["prompt"]
+    assert "seed" in llm.calls[1]
+    assert llm.calls[1]["temperature"] > llm.calls[0]["temperature"]
+
+def test_interactive_refine_accept(mock_input):
+    llm = FakeLlama(["feat: add hello world greeting", "feat: add hello"])
+    mock_input(["s", "a"])
+    assert interactive_refine(RefineSession(llm, PROMPT)) == "feat: add hello"
+    assert len(llm.calls) == 2
+
+def test_interactive_refine_quit(mock_input):
+    mock_input(["bogus", "q"])
+    assert interactive_refine(RefineSession(FakeLlama(["feat: a"]), PROMPT)) is None
+
+def test_interactive_refine_survives_context_overflow(mock_input):
+    class OverflowingLlama(FakeLlama):
+        def __call__(self, prompt, **kwargs):
+            if "Instruction:" in prompt:
+                raise ValueError("Requested tokens exceed context window of 256")
+            return super().__call__(prompt, **kwargs)
+
+    mock_input(["b", "a"])
+    assert interactive_refine(RefineSession(OverflowingLlama(["feat: add hello"]), PROMPT)) == "feat: add hello"
+
+def test_interactive_refine_keeps_message_on_empty_edit(mock_input, monkeypatch):
+    monkeypatch.setattr("gitcommitai.refine_session.edit_message_interactively", lambda message: "")
+    mock_input(["e", "a"])
+    assert interactive_refine(RefineSession(FakeLlama(["feat: add hello"]), PROMPT)) == "feat: add hello"
+
+def test_interactive_refine_refuses_empty_accept(mock_input):
+    mock_input(["a", "r", "a"])
+    llm = FakeLlama(["", "feat: add hello"])
+    assert interactive_refine(RefineSession(llm, PROMPT)) == "feat: add hello"
+
+@pytest.mark.parametrize("error", [EOFError, KeyboardInterrupt])
+def test_interactive_refine_quits_on_eof_and_interrupt(monkeypatch, error):
+    def raise_error(_):
+        raise error
+    monkeypatch.setattr("builtins.input", raise_error)
+    assert interactive_refine(RefineSession(FakeLlama(["feat: a"]), PROMPT)) is None